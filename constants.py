@@ -4,3 +4,6 @@ TARGET = 't'
 
 LESS_OR_EQUAL = 'LE'
 BIGGER_THAN = 'BT'
+
+# Cell values read as a missing attribute value
+MISSING_VALUES = ['', '?']
@@ -1,18 +1,29 @@
 from typing import List
-from constants import CATEGORICAL, NUMERIC, TARGET
+from constants import CATEGORICAL, NUMERIC, TARGET, MISSING_VALUES
 
 
 class Attribute(object):
+    __slots__ = ('name', 'value', 'attr_type')
+
     def __init__(self, name: str, value: str, attr_type: str):
         self.name = name
         self.attr_type = attr_type
-        if self.is_categorical() or self.is_target():
+        if self.is_target():
             self.value = value
-        elif self.is_numeric():
-            self.value = float(value)
+        elif self.is_categorical() or self.is_numeric():
+            # missing values are kept as None instead of becoming their own category
+            if value.strip() in MISSING_VALUES:
+                self.value = None
+            elif self.is_categorical():
+                self.value = value
+            else:
+                self.value = float(value)
         else:
             raise Exception('Invalid metadata type')
 
+    def is_missing(self):
+        return self.value is None
+
     def is_categorical(self):
         return self.attr_type == CATEGORICAL
 
@@ -0,0 +1,152 @@
+import statistics
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List
+from data_instance import DataInstance
+
+
+class NumericSummary(object):
+    __slots__ = ('minimum', 'maximum', 'quantiles')
+
+    def __init__(self, values: List[float], num_quantiles: int):
+        self.minimum = min(values)
+        self.maximum = max(values)
+        # cut points dividing the values into num_quantiles intervals of equal probability
+        self.quantiles = statistics.quantiles(values, n=num_quantiles) if len(values) > 1 else []
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __str__(self) -> str:
+        return 'NumericSummary{' \
+               'min=' + str(self.minimum) + \
+               ', max=' + str(self.maximum) + \
+               ', quantiles=' + str(self.quantiles) + \
+               '}'
+
+
+class MissingMask(object):
+    """
+    Ids of the instances missing the value of an attribute, for the instances of the dataset it was computed on.
+    Mostly-missing columns keep only the sorted ids with a value (four bytes each), when that is smaller than
+    keeping one byte per instance id. Ids outside the dataset are rejected by both forms.
+    """
+    __slots__ = ('_num_instances', '_num_missing', '_sparse', '_known_ids', '_dense', '_dataset_ids')
+
+    def __init__(self, missing_ids: List[int], known_ids: List[int], dataset_ids: bytearray = None):
+        # one byte per id marking the instances of the dataset, usually shared by every column
+        if dataset_ids is None:
+            dataset_ids = _id_membership(list(missing_ids) + list(known_ids))
+        self._dataset_ids = dataset_ids
+        self._num_instances = len(missing_ids) + len(known_ids)
+        self._num_missing = len(missing_ids)
+        # ids past the end of the dense array have a known value
+        dense_size = max(missing_ids) + 1 if len(missing_ids) > 0 else 0
+        self._sparse = array('i').itemsize * len(known_ids) < dense_size
+        self._known_ids = None
+        self._dense = None
+        if self._sparse:
+            self._known_ids = array('i', sorted(known_ids))
+        else:
+            self._dense = bytearray(dense_size)
+            for instance_id in missing_ids:
+                self._dense[instance_id] = 1
+
+    def is_missing(self, instance_id: int) -> bool:
+        if not 0 <= instance_id < len(self._dataset_ids) or self._dataset_ids[instance_id] == 0:
+            raise Exception('Instance id not found in the dataset of the missing mask. Instance id: '
+                            + str(instance_id))
+        if self._sparse:
+            position = bisect_left(self._known_ids, instance_id)
+            return position == len(self._known_ids) or self._known_ids[position] != instance_id
+        return instance_id < len(self._dense) and self._dense[instance_id] == 1
+
+    def has_missing(self) -> bool:
+        return self._num_missing > 0
+
+    def num_missing(self) -> int:
+        return self._num_missing
+
+    def missing_ratio(self) -> float:
+        return self._num_missing / self._num_instances if self._num_instances > 0 else 0.0
+
+    def is_sparse(self) -> bool:
+        return self._sparse
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __str__(self) -> str:
+        return 'MissingMask{' \
+               'num_missing=' + str(self._num_missing) + \
+               ', sparse=' + str(self._sparse) + \
+               '}'
+
+
+def _id_membership(instance_ids: List[int]) -> bytearray:
+    membership = bytearray(max(instance_ids) + 1 if len(instance_ids) > 0 else 0)
+    for instance_id in instance_ids:
+        membership[instance_id] = 1
+    return membership
+
+
+class DatasetStatistics(object):
+    """
+    Statistics of a whole dataset, computed in a single pass when the dataset is read.
+    The same object should be shared by every fold, forest and tree built from that dataset,
+    instead of recomputing the vocabularies for each tree.
+    """
+    def __init__(self, data_instances: List[DataInstance], num_quantiles: int = 4):
+        self.NUM_INSTANCES = len(data_instances)
+        self.CATEGORICAL_ATTRIBUTES = set(a.name for a in data_instances[0].attributes if a.is_categorical())
+        self.NUMERIC_ATTRIBUTES = set(a.name for a in data_instances[0].attributes if a.is_numeric())
+        self.CLASS_COUNTS = Counter(d.target.value for d in data_instances)
+
+        # single pass over every instance and attribute, keeping missing values apart
+        values = {a.name: [] for a in data_instances[0].attributes}
+        missing_ids = {a.name: [] for a in data_instances[0].attributes}
+        known_ids = {a.name: [] for a in data_instances[0].attributes}
+        for instance in data_instances:
+            for attribute in instance.attributes:
+                if attribute.is_missing():
+                    missing_ids[attribute.name].append(instance.id)
+                else:
+                    known_ids[attribute.name].append(instance.id)
+                    values[attribute.name].append(attribute.value)
+
+        self.POSSIBLE_VALUES = {name: list(set(values[name])) for name in values}
+        self._instance_ids = _id_membership([d.id for d in data_instances])
+        # looked up by instance id during split search, so columns without missing values skip the scan
+        self.MISSING_MASKS = {name: MissingMask(missing_ids[name], known_ids[name], self._instance_ids)
+                              for name in missing_ids}
+        # columns without any known value have no summary
+        self.NUMERIC_SUMMARIES = {name: NumericSummary(values[name], num_quantiles)
+                                  for name in self.NUMERIC_ATTRIBUTES if len(values[name]) > 0}
+
+    def possible_values_of_attributes(self) -> Dict[str, List[str]]:
+        """
+        Returns the unique values of every attribute, computed once for the whole dataset.
+        """
+        return self.POSSIBLE_VALUES
+
+    def covers(self, data_instances: List[DataInstance]) -> bool:
+        """
+        Tells whether every instance id belongs to the dataset these statistics were computed on.
+        """
+        ids = self._instance_ids
+        return all(0 <= d.id < len(ids) and ids[d.id] == 1 for d in data_instances)
+
+    def categorical_vocabularies(self) -> Dict[str, List[str]]:
+        return {name: self.POSSIBLE_VALUES[name] for name in self.CATEGORICAL_ATTRIBUTES}
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __str__(self) -> str:
+        return 'DatasetStatistics{' \
+               'num_instances=' + str(self.NUM_INSTANCES) + \
+               ', class_counts=' + str(dict(self.CLASS_COUNTS)) + \
+               ', missing_values=' + str({name: m.num_missing() for name, m in self.MISSING_MASKS.items()}) + \
+               ', numeric_summaries=' + str(self.NUMERIC_SUMMARIES) + \
+               '}'
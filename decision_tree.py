@@ -3,67 +3,80 @@ from typing import List, Tuple, Dict
 from data_instance import DataInstance
 from entropy_calculator import EntropyCalculator
 from tree_node import Node, LeafNode, DecisionNode, TreeBranch
+from dataset_statistics import MissingMask
 from constants import LESS_OR_EQUAL, BIGGER_THAN
 
 
 def get_decision_tree(data_instances: List[DataInstance],
                       attributes: List[str],
-                      possible_values_for_each_attribute: Dict[str, List[str]]) -> Node:
-    
+                      possible_values_for_each_attribute: Dict[str, List[str]],
+                      feature_importances: Dict[str, float] = None,
+                      missing_masks: Dict[str, MissingMask] = None) -> Node:
+    """
+    Builds the tree recursively. When feature_importances is given, the information gain of every split is
+    added to the attribute used on it, weighted by the number of instances reaching the split.
+    When the missing_masks of the dataset are given, they are used to find the instances missing a value.
+    """
     if instances_have_the_same_target(data_instances):
         return LeafNode(data_instances[0].target.value)
 
     if len(attributes) == 0:
         return LeafNode(most_frequent_target_of(data_instances))
 
-    entropy_calculator = EntropyCalculator(data_instances)
-    attribute_index_with_best_division_criteria = entropy_calculator.best_attribute()
+    entropy_calculator = EntropyCalculator(data_instances, missing_masks=missing_masks)
+    attribute_index_with_best_division_criteria, information_gain = entropy_calculator.best_attribute_with_gain()
     node = DecisionNode(data_instances[0].attributes[attribute_index_with_best_division_criteria].name)
     available_attributes = deepcopy(attributes)
     attribute_name = available_attributes[attribute_index_with_best_division_criteria]
     available_attributes.remove(attribute_name)
 
     attribute_index = attribute_index_with_best_division_criteria
+    missing_instances = instances_with_missing_value(attribute_name, data_instances, missing_masks)
+    if len(missing_instances) == len(data_instances):
+        return LeafNode(most_frequent_target_of(data_instances))
+
     if data_instances[0].attributes[attribute_index].is_categorical():
-        for attribute_value in possible_values_for_each_attribute[attribute_name]:
-            new_possible_instances = instances_with_attribute_value(attribute_value, attribute_name, data_instances)
-            if len(new_possible_instances) == 0:
-                return LeafNode(most_frequent_target_of(data_instances))
-            else:
-                instances_without_attribute = remove_attribute_from_instances(new_possible_instances, attribute_index)
-                new_node = get_decision_tree(instances_without_attribute, available_attributes, possible_values_for_each_attribute)
-                node.add_branch(TreeBranch(attribute_value, new_node))
-        return node
+        partitions = [(attribute_value, instances_with_attribute_value(attribute_value, attribute_name, data_instances))
+                      for attribute_value in possible_values_for_each_attribute[attribute_name]]
     else:  # is numeric
+        partitions = []
         for split_type, attribute_value in possible_values_from_numeric_attribute(attribute_index, entropy_calculator):
-            new_possible_instances = instances_that_are_at_range_of(attribute_value, attribute_name, split_type, data_instances)
-            if len(new_possible_instances) == 0:
-                return LeafNode(most_frequent_target_of(data_instances))
-            else:
-                node.set_as_numeric_node(attribute_value)
-                instances_without_attribute = remove_attribute_from_instances(new_possible_instances, attribute_index)
-                new_node = get_decision_tree(instances_without_attribute, available_attributes, possible_values_for_each_attribute)
-                node.add_branch(TreeBranch(split_type, new_node))
-        return node
-
+            node.set_as_numeric_node(attribute_value)
+            partitions.append((split_type, instances_that_are_at_range_of(attribute_value, attribute_name, split_type, data_instances)))
 
-def possible_values_of_attributes(data_instances: List[DataInstance]) -> Dict[str, List[str]]:
-    possible_values = {}
-
-    # initialize every attribute with an empty list inside dictionary
-    for attribute in data_instances[0].attributes:
-        possible_values[attribute.name] = []
+    if len(partitions) == 0 or any(len(new_possible_instances) == 0 for _, new_possible_instances in partitions):
+        return LeafNode(most_frequent_target_of(data_instances))
 
-    # append every attribute value of every instance into the list inside dictionary
+    # instances missing the attribute value follow the branch with the most instances
+    default_branch_value = max(partitions, key=lambda partition: len(partition[1]))[0]
+    node.set_default_branch_value(default_branch_value)
+
+    # the split is only credited once it is known to happen
+    if feature_importances is not None:
+        feature_importances[attribute_name] = feature_importances.get(attribute_name, 0.0) \
+            + len(data_instances) * information_gain
+
+    for branch_value, new_possible_instances in partitions:
+        if branch_value == default_branch_value:
+            new_possible_instances = new_possible_instances + missing_instances
+        instances_without_attribute = remove_attribute_from_instances(new_possible_instances, attribute_index)
+        new_node = get_decision_tree(instances_without_attribute, available_attributes,
+                                     possible_values_for_each_attribute, feature_importances, missing_masks)
+        node.add_branch(TreeBranch(branch_value, new_node))
+    return node
+
+
+def instances_with_attributes(data_instances: List[DataInstance], attribute_names: List[str]) -> List[DataInstance]:
+    """
+    Returns new instances holding only the given attributes and the target.
+    """
+    kept_attributes = set(attribute_names)
+    projected_instances = []
     for instance in data_instances:
-        for attribute in instance.attributes:
-            possible_values[attribute.name].append(attribute.value)
-
-    # transform every attribute list inside dictionary into an unique list
-    for attribute in possible_values:
-        possible_values[attribute] = list(set(possible_values[attribute]))
-
-    return possible_values
+        new_attributes = [attribute for attribute in instance.attributes if attribute.name in kept_attributes]
+        new_attributes.append(instance.target)
+        projected_instances.append(DataInstance(instance.id, new_attributes))
+    return projected_instances
 
 
 def instances_have_the_same_target(instances: List[DataInstance]) -> bool:
@@ -105,6 +118,17 @@ def instances_with_attribute_value(
             if instance.attribute_with_name(attribute_name).value == attribute_value]
 
 
+def instances_with_missing_value(attribute_name: str,
+                                 data_instances: List[DataInstance],
+                                 missing_masks: Dict[str, MissingMask] = None) -> List[DataInstance]:
+    if missing_masks is not None:
+        mask = missing_masks[attribute_name]
+        if not mask.has_missing():
+            return []
+        return [instance for instance in data_instances if mask.is_missing(instance.id)]
+    return [instance for instance in data_instances if instance.attribute_with_name(attribute_name).is_missing()]
+
+
 def remove_attribute_from_instances(data_instances: List[DataInstance], attribute_index: int) -> List[DataInstance]:
     instances_without_attribute = []
     for instance in data_instances:
@@ -121,6 +145,8 @@ def instances_that_are_at_range_of(attribute_value: float,
                                    data_instances: List[DataInstance]) -> List[DataInstance]:
     new_instances = []
     for instance in data_instances:
+        if instance.attribute_with_name(attribute_name).is_missing():
+            continue
         if split_type == LESS_OR_EQUAL and float(instance.attribute_with_name(attribute_name).value) <= attribute_value:
             new_instances.append(instance)
         elif split_type == BIGGER_THAN and float(instance.attribute_with_name(attribute_name).value) > attribute_value:
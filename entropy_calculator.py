@@ -1,8 +1,9 @@
 import math
 import operator
 import random
-from typing import List, Set
+from typing import Dict, List, Set, Tuple
 from data_instance import DataInstance
+from dataset_statistics import MissingMask
 
 
 class EntropyCalculator(object):
@@ -10,34 +11,61 @@ class EntropyCalculator(object):
     This class handles the entropy calculation for a partition of DataInstances in the tree.
     A new object should be created for each new partition of the tree.
     """
-    def __init__(self, data_instances: List[DataInstance]):
+    def __init__(self,
+                 data_instances: List[DataInstance],
+                 selected_attributes: List[int] = None,
+                 missing_masks: Dict[str, MissingMask] = None):
         self.DATA_INSTANCES = data_instances
+        self.MISSING_MASKS = missing_masks
         self.TARGET_INFORMATION_VALUE = self._calculate_entropy_target()
-        NUM_ATTR_TO_CHOOSE =  int(round(math.sqrt(len(self.DATA_INSTANCES[0].attributes))))
-        self.SELECTED_ATTRIBUTES = random.choices(range(len(self.DATA_INSTANCES[0].attributes)), k=NUM_ATTR_TO_CHOOSE)
+        if selected_attributes is not None:
+            self.SELECTED_ATTRIBUTES = selected_attributes
+        else:
+            NUM_ATTR_TO_CHOOSE =  int(round(math.sqrt(len(self.DATA_INSTANCES[0].attributes))))
+            self.SELECTED_ATTRIBUTES = random.choices(range(len(self.DATA_INSTANCES[0].attributes)), k=NUM_ATTR_TO_CHOOSE)
             
     def gain_ID3(self, attr_idx: int) -> float:
         """
-        Calculates the information gain for a given data_instances and attribute
+        Calculates the information gain for a given data_instances and attribute.
+        With missing values, the gain is calculated over the instances with a known value
+        and scaled by their fraction of the partition.
         """
-        return self.TARGET_INFORMATION_VALUE - self._calculate_entropy_attribute(attr_idx)
+        known_instances = self.__get_known_data_instances(attr_idx)
+        if len(known_instances) == len(self.DATA_INSTANCES):
+            return self.TARGET_INFORMATION_VALUE - self._calculate_entropy_attribute(attr_idx)
+        if len(known_instances) == 0:
+            return 0.0
+
+        known_fraction = len(known_instances) / len(self.DATA_INSTANCES)
+        return known_fraction * EntropyCalculator(known_instances, [attr_idx], self.MISSING_MASKS).gain_ID3(attr_idx)
     
     def best_attribute(self) -> int:
         """
         Returns the index of attribute with the greatest information gain for the partition.
         """
+        return self.best_attribute_with_gain()[0]
+
+    def best_attribute_with_gain(self) -> Tuple[int, float]:
+        """
+        Returns the index of attribute with the greatest information gain for the partition, along with that gain.
+        """
         info_gain_list = []
 
         for idx in self.SELECTED_ATTRIBUTES:
             info_gain_list.append(self.gain_ID3(idx))
 
-        return self.SELECTED_ATTRIBUTES[info_gain_list.index(max(info_gain_list))]
+        best_gain = max(info_gain_list)
+        return self.SELECTED_ATTRIBUTES[info_gain_list.index(best_gain)], best_gain
 
     def best_numerical_split_point(self, attr_idx: int) -> float:
         """
         Returns the point of best numerical split for the attribute.
         """
         if self.DATA_INSTANCES[0].attributes[attr_idx].is_numeric():
+            known_instances = self.__get_known_data_instances(attr_idx)
+            if 0 < len(known_instances) < len(self.DATA_INSTANCES):
+                known_calculator = EntropyCalculator(known_instances, [attr_idx], self.MISSING_MASKS)
+                return known_calculator.best_numerical_split_point(attr_idx)
             return self.__get_best_numerical_split(attr_idx)[0]
         else:
             raise Exception("Cannot get best numerical split for categorical attribute")
@@ -105,6 +133,10 @@ class EntropyCalculator(object):
                 possible_splits.append((float(prev.attributes[attr_idx].value) +
                                         float(curr.attributes[attr_idx].value)) / 2)
 
+        # Without class boundaries no split separates the targets, so the attribute brings no information
+        if len(possible_splits) == 0:
+            return [float(sorted_data_instances[-1].attributes[attr_idx].value), self.TARGET_INFORMATION_VALUE]
+
         splits_entropy = {}
 
         # Calculate the entropy for each possible split
@@ -122,6 +154,18 @@ class EntropyCalculator(object):
 
         return min(splits_entropy.items(), key=operator.itemgetter(1))
 
+    def __get_known_data_instances(self, attr_idx: int) -> List[DataInstance]:
+        """
+        Gets the data instances with a known value for the attribute.
+        When the dataset missing masks are given, attributes without missing values skip the scan.
+        """
+        if self.MISSING_MASKS is not None:
+            mask = self.MISSING_MASKS[self.DATA_INSTANCES[0].attributes[attr_idx].name]
+            if not mask.has_missing():
+                return self.DATA_INSTANCES
+            return [d for d in self.DATA_INSTANCES if not mask.is_missing(d.id)]
+        return [d for d in self.DATA_INSTANCES if not d.attributes[attr_idx].is_missing()]
+
     def __get_classes_categorical_attribute(self, attr_idx: int) -> Set[str]:
         """
         Retrieves all the different classes of an attribute.
@@ -6,6 +6,7 @@ from typing import List, Tuple
 from pathlib import Path
 from data_instance import DataInstance, Attribute
 from random_forest import RandomForest
+from dataset_statistics import DatasetStatistics
 from cross_validation import cross_validation_division
 from constants import TARGET
 
@@ -61,7 +62,9 @@ def create_attributes(header: List[str], attribute_values: List[str], attributes
 
     # For each attribute
     for idx in range(len(header)):
-        attributes.append(Attribute(header[idx], attribute_values[idx], attributes_metadata[idx]))
+        # trailing empty cells may be absent from the line, so they are read as missing values
+        value = attribute_values[idx] if idx < len(attribute_values) else ''
+        attributes.append(Attribute(header[idx], value, attributes_metadata[idx]))
 
     return attributes
 
@@ -76,6 +79,8 @@ def read_dataset(file_name: str, delimiter: str = ';') -> Tuple[List[DataInstanc
             headers = next(lines)
             instance_index = 0
             for line in lines:
+                if len(line) == 0:
+                    continue
                 attribute_values = line  # get all but last column
                 attributes = create_attributes(headers, attribute_values, metadata)
                 data_instances.append(DataInstance(instance_index, attributes))
@@ -89,7 +94,10 @@ def read_dataset(file_name: str, delimiter: str = ';') -> Tuple[List[DataInstanc
         sys.exit()
 
 
-def run_cross_validation(folds: List[DataInstance], headers: List[str], num_trees: int):
+def run_cross_validation(folds: List[List[DataInstance]],
+                         headers: List[str],
+                         num_trees: int,
+                         dataset_statistics: DatasetStatistics = None):
     NUM_FOLDS = len(folds)
 
     test_fold = 0
@@ -97,9 +105,10 @@ def run_cross_validation(folds: List[DataInstance], headers: List[str], num_tree
 
     for i in range(NUM_FOLDS):
         training_set = [data for i in range(NUM_FOLDS) if i != test_fold for data in folds[i]]
-        forest = RandomForest(training_set, num_trees, headers)
+        forest = RandomForest(training_set, num_trees, headers, dataset_statistics)
         # Evaluate performance of forest
-        pred = forest.classify(folds[test_fold])
+        # stopping on a decided majority gives the same predictions as evaluating every tree
+        pred, _ = forest.classify_with_early_exit(folds[test_fold])
         accuracy_list.append(count_equal_elements(pred, [d.target.value for d in folds[test_fold]]) / len(pred))
         test_fold += 1
 
@@ -121,8 +130,9 @@ def count_equal_elements(pred, real):
 def main():
     dataset_file_name = get_file_name()
     data_instances, headers = read_dataset(dataset_file_name, delimiter='\t')
+    dataset_statistics = DatasetStatistics(data_instances)
     [folds] = cross_validation_division(data_instances, int(sys.argv[2]), 1)
-    mean, stdev = run_cross_validation(folds, headers, int(sys.argv[3]))
+    mean, stdev = run_cross_validation(folds, headers, int(sys.argv[3]), dataset_statistics)
     print("Accuracy Mean: {0:.3f}%, Standard Dev: {1:.3f}%".format(mean*100, stdev*100))
 
 
@@ -143,10 +153,12 @@ def generate_data():
         csv_rows = [['k_folds', 'num_trees', 'mean', 'stdev']]
         with open("./results/" + d.stem + ".csv", 'w') as csv_file:
             data_instances, headers = read_dataset(d, delimiter='\t')
+            # computed once per dataset and shared by every fold, forest and tree
+            dataset_statistics = DatasetStatistics(data_instances)
             for f in NUM_FOLDS:
                 [folds] = cross_validation_division(data_instances, f, 1)
                 for t in NUM_TREES:
-                    mean, stdev = run_cross_validation(folds, headers, t)
+                    mean, stdev = run_cross_validation(folds, headers, t, dataset_statistics)
                     csv_rows.append([f, t, mean, stdev])
                     # Throw to csv
                     print("Folds {2} Trees {3} - Accuracy Mean: {0:.3f}%, Standard Dev: {1:.3f}%".format(mean*100, stdev*100, f, t))
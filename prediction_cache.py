@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from typing import Optional
+
+
+class PredictionCache(object):
+    """
+    Bounded LRU cache of forest predictions, keyed on the encoded rows of the instances.
+    Rows are used directly as dictionary keys, so they are looked up by their hash and
+    two different rows with the same hash never share a prediction.
+    The cache is tied to a version of the forest and is emptied when that version changes.
+    """
+    def __init__(self, max_size: int = 1024):
+        if max_size <= 0:
+            raise Exception('Prediction cache size must be positive. Size: ' + str(max_size))
+        self.MAX_SIZE = max_size
+        self._entries = OrderedDict()
+        self._forest_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def validate(self, forest_version: int) -> None:
+        """
+        Drops every cached prediction if they were made by another version of the forest.
+        """
+        if forest_version != self._forest_version:
+            self._entries.clear()
+            self._forest_version = forest_version
+
+    def get(self, row: tuple) -> Optional[str]:
+        prediction = self._entries.get(row)
+        if prediction is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(row)
+        return prediction
+
+    def put(self, row: tuple, prediction: str) -> None:
+        self._entries[row] = prediction
+        self._entries.move_to_end(row)
+        if len(self._entries) > self.MAX_SIZE:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __str__(self) -> str:
+        return 'PredictionCache{' \
+               'size=' + str(len(self._entries)) + \
+               ', max_size=' + str(self.MAX_SIZE) + \
+               ', hits=' + str(self.hits) + \
+               ', misses=' + str(self.misses) + \
+               ', evictions=' + str(self.evictions) + \
+               '}'
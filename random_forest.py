@@ -1,26 +1,231 @@
 from collections import Counter
-from decision_tree import get_decision_tree, possible_values_of_attributes
+from copy import copy
+from typing import Dict, Tuple
+import random
+from decision_tree import get_decision_tree, instances_with_attributes
+from dataset_statistics import DatasetStatistics
+from prediction_cache import PredictionCache
+from tree_arena import FeatureEncoder, TreeArena
 from bootstrap import *
 
 
 class RandomForest(object):
-    def __init__(self, dataset: List[DataInstance], num_trees: int, data_headers: List[str]):
+    def __init__(self,
+                 dataset: List[DataInstance],
+                 num_trees: int,
+                 data_headers: List[str],
+                 dataset_statistics: DatasetStatistics = None):
         self.DATASET = dataset
         self.NUM_TREES = num_trees
         self.DATA_HEADERS = data_headers
-        # Get bootstraps
-        self.BOOTSTRAPS = bootstraps_with_resampling(self.DATASET, self.NUM_TREES)
-        # Create trees
-        self.TREES = [get_decision_tree(b.training_set, self.DATA_HEADERS, possible_values_of_attributes(self.DATASET)) for b in self.BOOTSTRAPS]
+        # Reuse the statistics of the whole dataset when given, otherwise compute them once for this forest
+        self.STATISTICS = dataset_statistics if dataset_statistics is not None else DatasetStatistics(self.DATASET)
+        if not self.STATISTICS.covers(self.DATASET):
+            raise Exception('Dataset statistics were not computed on a dataset containing the training instances')
+        self.prediction_cache = None
+        # Incremented every time the trees change, invalidating cached predictions
+        self._version = 0
+        self._build_trees()
+
+    def enable_prediction_cache(self, max_size: int = 1024) -> PredictionCache:
+        """
+        Attaches a bounded LRU cache of predictions to the forest, so repeated instances are answered without
+        evaluating the trees again.
+        """
+        self.prediction_cache = PredictionCache(max_size)
+        return self.prediction_cache
+
+    def disable_prediction_cache(self) -> None:
+        self.prediction_cache = None
     
-    def classify(self, test_set: List[DataInstance]) -> str:
+    def classify(self, test_set: List[DataInstance]) -> List[str]:
         """
         Majority vote classification for Random Forest.
         """
-        pred = [self.__most_common([t.classify(data) for t in self.TREES]) for data in test_set]        
+        if self.prediction_cache is None:
+            rows = self.ENCODER.encode_all(test_set)
+            return [self.__most_common([t.classify_encoded(row) for t in self.TREES]) for row in rows]
+
+        # rows are looked up one at a time, so duplicates inside the same test set are also answered by the cache
+        self.prediction_cache.validate(self._version)
+        pred = []
+        for row in self.ENCODER.encode_all(test_set):
+            prediction = self.prediction_cache.get(row)
+            if prediction is None:
+                prediction = self.__most_common([t.classify_encoded(row) for t in self.TREES])
+                self.prediction_cache.put(row, prediction)
+            pred.append(prediction)
 
         return pred 
 
+    def classify_with_early_exit(self,
+                                 test_set: List[DataInstance],
+                                 chunk_size: int = 10,
+                                 margin_threshold: float = None) -> Tuple[List[str], int]:
+        """
+        Majority vote classification that evaluates the trees in chunks, retiring an instance as soon as its
+        leading class cannot be overtaken by the remaining trees, which gives the same answer as classify.
+        When margin_threshold is given, an instance is also retired once the vote difference between its two
+        leading classes reaches that fraction of the forest, which may differ from the full majority vote.
+        Duplicated instances are voted once and share the prediction.
+        Returns the predictions and the number of tree evaluations saved.
+        """
+        if chunk_size <= 0:
+            raise Exception('Chunk size must be positive. Chunk size: ' + str(chunk_size))
+        if margin_threshold is not None and not 0 < margin_threshold <= 1:
+            raise Exception('Margin threshold must be in (0, 1]. Margin threshold: ' + str(margin_threshold))
+
+        test_rows = self.ENCODER.encode_all(test_set)
+        rows = list(dict.fromkeys(test_rows))
+        num_trees = len(self.TREES)
+        votes = [Counter() for _ in rows]
+        pred = self.__cached_predictions(rows)
+        active = [idx for idx in range(len(rows)) if pred[idx] is None]
+        num_evaluations = 0
+
+        for start in range(0, num_trees, chunk_size):
+            chunk = self.TREES[start:start + chunk_size]
+            remaining_trees = num_trees - start - len(chunk)
+            still_active = []
+            for idx in active:
+                for t in chunk:
+                    votes[idx][t.classify_encoded(rows[idx])] += 1
+                num_evaluations += len(chunk)
+                if remaining_trees == 0 or self.__is_vote_decided(votes[idx], remaining_trees, margin_threshold):
+                    pred[idx] = votes[idx].most_common(1)[0][0]
+                    # only exact majorities are cached, so later calls without a margin stay exact
+                    if margin_threshold is None:
+                        self.__cache_prediction(rows[idx], pred[idx])
+                else:
+                    still_active.append(idx)
+            active = still_active
+            if len(active) == 0:
+                break
+
+        predictions = dict(zip(rows, pred))
+        return [predictions[row] for row in test_rows], len(test_rows) * num_trees - num_evaluations
+
+    def oob_permutation_importance(self, seed=None) -> Dict[str, float]:
+        """
+        Mean accuracy drop of each tree on its out-of-bag instances when the values of an attribute are shuffled.
+        Each out-of-bag set is encoded once and every permutation is classified as a batch.
+        """
+        self.__check_training_data()
+        if seed is not None:
+            random.seed(seed)
+
+        importances = {name: 0.0 for name in self.DATA_HEADERS}
+        num_evaluated_trees = 0
+
+        for tree, bootstrap in zip(self.TREES, self.BOOTSTRAPS):
+            if len(bootstrap.test_set) == 0:
+                continue
+            rows = self.ENCODER.encode_all(bootstrap.test_set)
+            targets = [d.target.value for d in bootstrap.test_set]
+            baseline_accuracy = self.__accuracy(tree.classify_batch(rows), targets)
+            for attr_idx, name in enumerate(self.ENCODER.ATTRIBUTE_NAMES):
+                column = [row[attr_idx] for row in rows]
+                random.shuffle(column)
+                permuted_rows = [row[:attr_idx] + (value,) + row[attr_idx + 1:] for row, value in zip(rows, column)]
+                importances[name] += baseline_accuracy - self.__accuracy(tree.classify_batch(permuted_rows), targets)
+            num_evaluated_trees += 1
+
+        if num_evaluated_trees > 0:
+            for name in importances:
+                importances[name] /= num_evaluated_trees
+        return importances
+
+    def drop_low_importance_features(self, min_importance: float) -> List[str]:
+        """
+        Rebuilds the forest without the attributes whose impurity importance is below min_importance.
+        The most important attribute is always kept. Returns the names of the dropped attributes.
+        Nothing is dropped when no tree has a split, since the importances then rank no attribute.
+        """
+        self.__check_training_data()
+        if sum(self.FEATURE_IMPORTANCES.values()) == 0:
+            return []
+        kept_headers = [h for h in self.DATA_HEADERS if self.FEATURE_IMPORTANCES[h] >= min_importance]
+        if len(kept_headers) == 0:
+            kept_headers = [max(self.DATA_HEADERS, key=lambda h: self.FEATURE_IMPORTANCES[h])]
+        dropped_headers = [h for h in self.DATA_HEADERS if h not in kept_headers]
+
+        if len(dropped_headers) > 0:
+            self.DATA_HEADERS = kept_headers
+            self.DATASET = instances_with_attributes(self.DATASET, self.DATA_HEADERS)
+            self._build_trees()
+
+        return dropped_headers
+
+    def without_training_data(self) -> 'RandomForest':
+        """
+        Returns a copy of the forest sharing its trees but not its training data, which is only needed to build
+        the trees, so it is cheap to pickle and ship to worker processes.
+        The copy classifies as before, but cannot compute out-of-bag importances or drop features.
+        """
+        forest = copy(self)
+        forest.DATASET = None
+        forest.BOOTSTRAPS = None
+        forest.STATISTICS = None
+        # the copy gets its own cache, so rebuilding either forest does not empty the other one's
+        if self.prediction_cache is not None:
+            forest.prediction_cache = PredictionCache(self.prediction_cache.MAX_SIZE)
+        return forest
+
+    def _build_trees(self) -> None:
+        possible_values = self.STATISTICS.possible_values_of_attributes()
+        # Encoder shared by all trees, so each instance is encoded once per classification
+        self.ENCODER = FeatureEncoder(self.DATA_HEADERS, possible_values, self.STATISTICS.CATEGORICAL_ATTRIBUTES)
+        # Get bootstraps
+        self.BOOTSTRAPS = bootstraps_with_resampling(self.DATASET, self.NUM_TREES)
+        # Create trees, compacting each one into an arena once it is built,
+        # and collect the weighted information gain of every split while building them
+        self.TREES = []
+        self.FEATURE_IMPORTANCES = {name: 0.0 for name in self.DATA_HEADERS}
+        for b in self.BOOTSTRAPS:
+            tree_importances = {}
+            tree = get_decision_tree(b.training_set, self.DATA_HEADERS, possible_values, tree_importances,
+                                     self.STATISTICS.MISSING_MASKS)
+            self.TREES.append(TreeArena(tree, self.ENCODER))
+            for name in tree_importances:
+                self.FEATURE_IMPORTANCES[name] += tree_importances[name] / len(b.training_set)
+        self.__normalize_feature_importances()
+        self._version += 1
+
+    def __check_training_data(self) -> None:
+        if self.DATASET is None:
+            raise Exception('Forest has no training data, it was left out by without_training_data')
+
+    def __normalize_feature_importances(self) -> None:
+        total_importance = sum(self.FEATURE_IMPORTANCES.values())
+        if total_importance > 0:
+            for name in self.FEATURE_IMPORTANCES:
+                self.FEATURE_IMPORTANCES[name] /= total_importance
+
+    def __accuracy(self, pred: List[str], targets: List[str]) -> float:
+        return sum(1 for p, t in zip(pred, targets) if p == t) / len(targets)
+
+    def __cached_predictions(self, rows: List[tuple]) -> List[str]:
+        """
+        Returns the cached prediction of each row, or None for rows that must be classified by the trees.
+        """
+        if self.prediction_cache is None:
+            return [None] * len(rows)
+        self.prediction_cache.validate(self._version)
+        return [self.prediction_cache.get(row) for row in rows]
+
+    def __cache_prediction(self, row: tuple, prediction: str) -> None:
+        if self.prediction_cache is not None:
+            self.prediction_cache.put(row, prediction)
+
+    def __is_vote_decided(self, votes: Counter, remaining_trees: int, margin_threshold: float) -> bool:
+        top = votes.most_common(2)
+        leader_votes = top[0][1]
+        runner_up_votes = top[1][1] if len(top) > 1 else 0
+        # strictly ahead, so not even a tie is possible with the remaining trees
+        if leader_votes > runner_up_votes + remaining_trees:
+            return True
+        return margin_threshold is not None and (leader_votes - runner_up_votes) / len(self.TREES) >= margin_threshold
+
     def __most_common(self, l: List[object]):
         data = Counter(l)
         return data.most_common(1)[0][0]
@@ -0,0 +1,221 @@
+from array import array
+from typing import Dict, List, Set, Sequence
+from data_instance import DataInstance
+from tree_node import Node, LeafNode, DecisionNode
+from constants import LESS_OR_EQUAL, BIGGER_THAN
+
+NUMERIC_NODE = 0
+CATEGORICAL_NODE = 1
+
+# fields of each decision node record; the parameter is the threshold index of numeric nodes
+# and the vocabulary size of categorical nodes
+ATTRIBUTE_FIELD = 0
+KIND_FIELD = 1
+CHILDREN_FIELD = 2
+PARAMETER_FIELD = 3
+DEFAULT_FIELD = 4
+NODE_FIELDS = 5
+
+# child references below NO_CHILD stand for leaves
+NO_CHILD = -1
+
+
+class FeatureEncoder(object):
+    """
+    Turns data instances into flat rows shared by every TreeArena of a forest.
+    Numeric attributes are kept as floats and categorical attributes are replaced by their code in the vocabulary,
+    so each instance is encoded once and then classified by all trees. Missing values are encoded as None.
+    """
+    __slots__ = ('ATTRIBUTE_NAMES', '_attribute_indexes', '_vocabularies', '_codes')
+
+    def __init__(self,
+                 attribute_names: List[str],
+                 vocabularies: Dict[str, List[str]],
+                 categorical_attributes: Set[str]):
+        self.ATTRIBUTE_NAMES = list(attribute_names)
+        self._attribute_indexes = {name: idx for idx, name in enumerate(self.ATTRIBUTE_NAMES)}
+        self._vocabularies = [vocabularies[name] if name in categorical_attributes else None
+                              for name in self.ATTRIBUTE_NAMES]
+        self._codes = [{value: code for code, value in enumerate(vocabulary)} if vocabulary is not None else None
+                       for vocabulary in self._vocabularies]
+
+    def attribute_index(self, attribute_name: str) -> int:
+        return self._attribute_indexes[attribute_name]
+
+    def value_code(self, attribute_index: int, value: str) -> int:
+        return self._codes[attribute_index].get(value, NO_CHILD)
+
+    def vocabulary_size(self, attribute_index: int) -> int:
+        return len(self._vocabularies[attribute_index])
+
+    def encode(self, instance: DataInstance) -> tuple:
+        row = [None] * len(self.ATTRIBUTE_NAMES)
+        for attribute in instance.attributes:
+            idx = self._attribute_indexes.get(attribute.name)
+            if idx is None or attribute.is_missing():
+                continue
+            if self._codes[idx] is None:
+                row[idx] = float(attribute.value)
+            else:
+                row[idx] = self._codes[idx].get(attribute.value, NO_CHILD)
+        return tuple(row)
+
+    def encode_all(self, instances: List[DataInstance]) -> List[tuple]:
+        return [self.encode(instance) for instance in instances]
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __str__(self) -> str:
+        return 'FeatureEncoder{' \
+               'attributes=' + str(self.ATTRIBUTE_NAMES) + \
+               '}'
+
+
+class TreeArena(object):
+    """
+    Flat storage of a decision tree in typed arrays, holding only its decision nodes.
+    A child reference is the index of a decision node when non-negative, or stands for a leaf when below NO_CHILD,
+    so leaves take no storage besides the reference pointing to them.
+    Each decision node is a record of NODE_FIELDS values in the node array. Numeric nodes point to their
+    threshold and to a pair of children, while categorical nodes point to a dense slice of the child table
+    indexed by the code of the attribute value. Every decision node also keeps the default child followed by
+    instances missing the attribute value.
+    Integer arrays use the narrowest typecode holding their values, so the tree is cheap to keep and to pickle.
+    """
+    __slots__ = ('ENCODER', 'CLASSES', '_root', '_nodes', '_children', '_thresholds')
+
+    def __init__(self, root: Node, encoder: FeatureEncoder):
+        self.ENCODER = encoder
+        self.CLASSES = []
+        nodes = []
+        children = []
+        self._thresholds = array('d')
+        self._root = self._add_node(root, {}, nodes, children)
+        self._nodes = _compact_array(nodes)
+        self._children = _compact_array(children)
+
+    def classify(self, instance: DataInstance) -> str:
+        return self.classify_encoded(self.ENCODER.encode(instance))
+
+    def classify_encoded(self, row: Sequence) -> str:
+        nodes = self._nodes
+        children = self._children
+        reference = self._root
+        while reference >= 0:
+            record = reference * NODE_FIELDS
+            value = row[nodes[record + ATTRIBUTE_FIELD]]
+            if value is None:
+                child = nodes[record + DEFAULT_FIELD]
+                if child == NO_CHILD:
+                    raise Exception('Instance is missing the attribute value and node has no default branch. '
+                                    'Node attribute: ' + self.ENCODER.ATTRIBUTE_NAMES[nodes[record + ATTRIBUTE_FIELD]])
+            elif nodes[record + KIND_FIELD] == NUMERIC_NODE:
+                offset = nodes[record + CHILDREN_FIELD]
+                if value <= self._thresholds[nodes[record + PARAMETER_FIELD]]:
+                    child = children[offset]
+                else:
+                    child = children[offset + 1]
+            else:
+                child = NO_CHILD
+                if 0 <= value < nodes[record + PARAMETER_FIELD]:
+                    child = children[nodes[record + CHILDREN_FIELD] + value]
+                if child == NO_CHILD:
+                    raise Exception('Attribute value of instance not matched on any child branch. Node attribute: '
+                                    + self.ENCODER.ATTRIBUTE_NAMES[nodes[record + ATTRIBUTE_FIELD]])
+            reference = child
+        return self.CLASSES[_leaf_class_code(reference)]
+
+    def classify_batch(self, rows: List[Sequence]) -> List[str]:
+        return [self.classify_encoded(row) for row in rows]
+
+    def num_decision_nodes(self) -> int:
+        return len(self._nodes) // NODE_FIELDS
+
+    def num_leaves(self) -> int:
+        return sum(1 for reference in self._children if reference < NO_CHILD) + (1 if self._root < NO_CHILD else 0)
+
+    def num_nodes(self) -> int:
+        return self.num_decision_nodes() + self.num_leaves()
+
+    def _add_node(self, node: Node, class_codes: Dict[str, int], nodes: List[int], children: List[int]) -> int:
+        """
+        Adds the subtree to the node and child lists, returning the reference to its root.
+        """
+        if isinstance(node, LeafNode):
+            classification = node.get_classification()
+            if classification not in class_codes:
+                class_codes[classification] = len(self.CLASSES)
+                self.CLASSES.append(classification)
+            return _leaf_reference(class_codes[classification])
+        elif not isinstance(node, DecisionNode):
+            raise Exception('Unknown node type: ' + type(node).__name__)
+
+        reference = len(nodes) // NODE_FIELDS
+        record = len(nodes)
+        attribute_index = self.ENCODER.attribute_index(node.get_associate_attribute())
+        nodes.extend([0] * NODE_FIELDS)
+        nodes[record + ATTRIBUTE_FIELD] = attribute_index
+        nodes[record + DEFAULT_FIELD] = NO_CHILD
+        # reserve the node children before adding them, so that subtrees get their own slices after it
+        offset = len(children)
+        nodes[record + CHILDREN_FIELD] = offset
+
+        if node.get_numeric_attribute_value() is not None:
+            nodes[record + KIND_FIELD] = NUMERIC_NODE
+            nodes[record + PARAMETER_FIELD] = len(self._thresholds)
+            self._thresholds.append(node.get_numeric_attribute_value())
+            children.extend([NO_CHILD, NO_CHILD])
+            for branch in node.get_branches():
+                child = self._add_node(branch.node, class_codes, nodes, children)
+                if branch.value == node.get_default_branch_value():
+                    nodes[record + DEFAULT_FIELD] = child
+                if branch.value == LESS_OR_EQUAL:
+                    children[offset] = child
+                elif branch.value == BIGGER_THAN:
+                    children[offset + 1] = child
+        else:
+            nodes[record + KIND_FIELD] = CATEGORICAL_NODE
+            size = self.ENCODER.vocabulary_size(attribute_index)
+            nodes[record + PARAMETER_FIELD] = size
+            children.extend([NO_CHILD] * size)
+            for branch in node.get_branches():
+                code = self.ENCODER.value_code(attribute_index, branch.value)
+                child = self._add_node(branch.node, class_codes, nodes, children)
+                if branch.value == node.get_default_branch_value():
+                    nodes[record + DEFAULT_FIELD] = child
+                if code != NO_CHILD:
+                    children[offset + code] = child
+
+        return reference
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __str__(self) -> str:
+        return 'TreeArena{' \
+               'nodes=' + str(self.num_nodes()) + \
+               ', leaves=' + str(self.num_leaves()) + \
+               ', classes=' + str(self.CLASSES) + \
+               '}'
+
+
+def _leaf_reference(class_code: int) -> int:
+    return NO_CHILD - 1 - class_code
+
+
+def _leaf_class_code(reference: int) -> int:
+    return NO_CHILD - 1 - reference
+
+
+def _compact_array(values: List[int]) -> array:
+    """
+    Stores the integers in an array of the narrowest signed typecode holding all of them.
+    """
+    low = min(values, default=0)
+    high = max(values, default=0)
+    for typecode in ('b', 'h', 'i', 'q'):
+        limit = 1 << (array(typecode).itemsize * 8 - 1)
+        if -limit <= low and high < limit:
+            return array(typecode, values)
+    raise Exception('Values do not fit in any array typecode')
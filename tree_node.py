@@ -1,15 +1,20 @@
 from abc import ABC, abstractmethod
+from typing import List
 from data_instance import Attribute, DataInstance
 from constants import LESS_OR_EQUAL, BIGGER_THAN
 
 
 class Node(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def classify(self, instance: DataInstance) -> str:
         pass
 
 
 class TreeBranch:
+    __slots__ = ('value', 'node')
+
     def __init__(self, value: str, node: Node):
         self.value = value
         self.node = node
@@ -25,9 +30,14 @@ class TreeBranch:
 
 
 class LeafNode(Node):
+    __slots__ = ('_classification',)
+
     def __init__(self, classification: str):
         self._classification = classification
 
+    def get_classification(self) -> str:
+        return self._classification
+
     def classify(self, instance: DataInstance) -> str:
         return self._classification
 
@@ -41,10 +51,25 @@ class LeafNode(Node):
 
 
 class DecisionNode(Node):
+    __slots__ = ('_associate_attribute', '_branches', '_numeric_attribute_value', '_default_branch_value')
+
     def __init__(self, associate_attribute: str, numeric_attribute_value: float = None):
         self._associate_attribute = associate_attribute
         self._branches = []
         self._numeric_attribute_value = numeric_attribute_value
+        self._default_branch_value = None
+
+    def get_associate_attribute(self) -> str:
+        return self._associate_attribute
+
+    def get_numeric_attribute_value(self) -> float:
+        return self._numeric_attribute_value
+
+    def get_branches(self) -> List[TreeBranch]:
+        return self._branches
+
+    def get_default_branch_value(self) -> str:
+        return self._default_branch_value
 
     def add_branch(self, branch: TreeBranch) -> None:
         self._branches.append(branch)
@@ -52,6 +77,12 @@ class DecisionNode(Node):
     def set_as_numeric_node(self, numeric_attribute_value: float) -> None:
         self._numeric_attribute_value = numeric_attribute_value
 
+    def set_default_branch_value(self, default_branch_value: str) -> None:
+        """
+        Sets the branch followed by instances missing the value of the node attribute.
+        """
+        self._default_branch_value = default_branch_value
+
     def classify(self, instance: DataInstance) -> str:
         for instance_attribute in instance.attributes:
             if instance_attribute.name == self._associate_attribute:
@@ -61,7 +92,9 @@ class DecisionNode(Node):
                         + self._associate_attribute)
 
     def _classify_on_correct_branch(self, instance: DataInstance, instance_attribute: Attribute) -> str:
-        if self._is_node_associate_to_a_numeric_attribute():
+        if instance_attribute.is_missing():
+            return self._classify_on_default_branch(instance)
+        elif self._is_node_associate_to_a_numeric_attribute():
             return self._classify_on_numeric_node(instance, instance_attribute)
         else:
             return self._classify_on_categorical_node(instance, instance_attribute)
@@ -83,6 +116,14 @@ class DecisionNode(Node):
 
         raise Exception('Split type not found on any child branch. Split type: ' + split_type)
 
+    def _classify_on_default_branch(self, instance: DataInstance) -> str:
+        for branch in self._branches:
+            if self._default_branch_value is not None and branch.value == self._default_branch_value:
+                return branch.node.classify(instance)
+
+        raise Exception('Instance is missing the attribute value and node has no default branch. Node attribute: '
+                        + self._associate_attribute)
+
     def _classify_on_categorical_node(self, instance: DataInstance, instance_attribute: Attribute) -> str:
         for branch in self._branches:
             if branch.value == instance_attribute.value: